@@ -26,6 +26,7 @@ class Settings(BaseSettings):
     # Redis
     REDIS_URL: str = "redis://localhost:6379"
     REDIS_CACHE_TTL: int = 300  # 5 minutes
+    HOT_ROUTE_CACHE_ENABLED: bool = False  # precompute hot-route flight forecasts into Redis
     
     # CORS
     ALLOWED_ORIGINS: List[str] = [
@@ -3,6 +3,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import logging
 from prometheus_client import make_asgi_app
 
@@ -29,11 +30,24 @@ async def lifespan(app: FastAPI):
     from app.services.forecasting.model_loader import load_models
     await load_models()
     
+    # Keep forecasts for the most-searched routes warm in Redis
+    from app.services.forecasting.hot_routes import run_hot_route_refresher, close_redis
+    hot_route_task = None
+    if settings.HOT_ROUTE_CACHE_ENABLED:
+        hot_route_task = asyncio.create_task(run_hot_route_refresher())
+    
     logger.info("Application started successfully!")
     
     yield
     
     logger.info("Shutting down application...")
+    if hot_route_task is not None:
+        hot_route_task.cancel()
+        try:
+            await hot_route_task
+        except asyncio.CancelledError:
+            pass
+    await close_redis()
     await engine.dispose()
 
 
@@ -118,5 +132,6 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=True,
-        log_level="info"
+        log_level="info",
+        ws_per_message_deflate=False
     )
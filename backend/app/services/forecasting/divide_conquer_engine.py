@@ -28,6 +28,8 @@ class DataSegmenter:
     Implements the 'Divide' phase of divide-and-conquer
     """
     
+    DEMAND_FEATURES = ['days_to_departure', 'occupancy_rate', 'price']
+    
     def __init__(self, min_segment_size: int = 10):
         self.min_segment_size = min_segment_size
         
@@ -39,7 +41,7 @@ class DataSegmenter:
             if len(group) >= self.min_segment_size:
                 segment = DataSegment(
                     segment_id=f"route_{origin}_{dest}",
-                    data=group.copy(),
+                    data=group,
                     metadata={
                         'origin': origin,
                         'destination': dest,
@@ -58,13 +60,18 @@ class DataSegmenter:
         freq: 'D' (daily), 'W' (weekly), 'M' (monthly)
         """
         segments = []
-        df['period'] = pd.to_datetime(df['date']).dt.to_period(freq)
-        
-        for period, group in df.groupby('period'):
+        dates = df['date']
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates)
+        # Group on a derived key rather than adding a column, so the (possibly
+        # shared) input frame is never mutated and segments can reference it directly
+        periods = dates.dt.to_period(freq).rename('period')
+        
+        for period, group in df.groupby(periods):
             if len(group) >= self.min_segment_size:
                 segment = DataSegment(
                     segment_id=f"temporal_{period}",
-                    data=group.copy(),
+                    data=group,
                     metadata={
                         'period': str(period),
                         'size': len(group),
@@ -84,7 +91,7 @@ class DataSegmenter:
             if len(group) >= self.min_segment_size:
                 segment = DataSegment(
                     segment_id=f"airline_{airline}",
-                    data=group.copy(),
+                    data=group,
                     metadata={
                         'airline': airline,
                         'size': len(group)
@@ -102,15 +109,22 @@ class DataSegmenter:
         """
         from sklearn.cluster import KMeans
         
-        # Extract demand features
-        features = df[['days_to_departure', 'occupancy_rate', 'price']].values
-        
         # Determine optimal clusters (3-5 typical demand patterns)
         n_clusters = min(5, len(df) // self.min_segment_size)
         if n_clusters < 2:
             return []
         
+        # Extract demand features
+        features = df[self.DEMAND_FEATURES].to_numpy(dtype=np.float32, copy=False)
+        
+        # Standardize so price (~1000x occupancy) doesn't dominate the distance;
+        # stats come from this frame since the segmenter is shared across routes and modes
+        std = features.std(axis=0)
+        std[std == 0] = 1.0
+        features = (features - features.mean(axis=0)) / std
+        
         kmeans = KMeans(n_clusters=n_clusters, random_state=42)
+        # Label the full frame once before splitting; segments only read from it
         df['demand_cluster'] = kmeans.fit_predict(features)
         
         segments = []
@@ -118,7 +132,7 @@ class DataSegmenter:
             if len(group) >= self.min_segment_size:
                 segment = DataSegment(
                     segment_id=f"demand_{cluster_id}",
-                    data=group.copy(),
+                    data=group,
                     metadata={
                         'cluster_id': int(cluster_id),
                         'size': len(group),
@@ -142,6 +156,14 @@ class DataSegmenter:
         
         # Level 2: Further segment each route by time
         for route_segment in route_segments:
+            # Tail routes can't fill even two weekly buckets - keep them whole
+            # instead of paying for a temporal split that yields nothing
+            dates = route_segment.data['date']
+            n_weeks = (dates.max() - dates.min()).days // 7 + 1
+            if len(route_segment.data) < self.min_segment_size * max(2, n_weeks):
+                all_segments.append(route_segment)
+                continue
+            
             temporal_segments = self.segment_by_temporal(
                 route_segment.data, 
                 freq='W'  # Weekly granularity
@@ -175,7 +197,8 @@ class SegmentForecaster:
             model = ARIMA(prices, order=(1, 1, 1))
             fitted = model.fit()
             forecast = fitted.forecast(steps=horizon)
-            return forecast
+            # statsmodels returns float64; float32 is plenty for prices
+            return forecast.astype(np.float32, copy=False)
         except Exception as e:
             logger.warning(f"ARIMA failed for {segment.segment_id}: {e}")
             # Fallback to moving average
@@ -186,18 +209,29 @@ class SegmentForecaster:
         prices = segment.data['price'].values
         ma = np.convolve(prices, np.ones(window)/window, mode='valid')
         last_ma = ma[-1] if len(ma) > 0 else np.mean(prices)
-        return np.full(horizon, last_ma)
+        return np.full(horizon, last_ma, dtype=np.float32)
     
     def forecast_exponential_smoothing(self, segment: DataSegment, horizon: int) -> np.ndarray:
         """Exponential smoothing forecast"""
-        from statsmodels.tsa.holtwinters import ExponentialSmoothing
+        from statsmodels.tsa.holtwinters import ExponentialSmoothing, SimpleExpSmoothing
+        
+        seasonal_periods = 7
+        # Bound the optimizer to avoid occasional pathological fits
+        minimize_kwargs = {'options': {'maxiter': 50}}
         
         try:
             prices = segment.data['price'].values
-            model = ExponentialSmoothing(prices, seasonal_periods=7, trend='add', seasonal='add')
-            fitted = model.fit()
+            if len(prices) < 2 * seasonal_periods + 4:
+                # Too short for a seasonal fit - use the cheap single-parameter model
+                model = SimpleExpSmoothing(prices)
+            else:
+                model = ExponentialSmoothing(
+                    prices, seasonal_periods=seasonal_periods, trend='add', seasonal='add'
+                )
+            fitted = model.fit(minimize_kwargs=minimize_kwargs)
             forecast = fitted.forecast(steps=horizon)
-            return forecast
+            # statsmodels returns float64; float32 is plenty for prices
+            return forecast.astype(np.float32, copy=False)
         except Exception as e:
             logger.warning(f"Exponential smoothing failed: {e}")
             return self.forecast_moving_average(segment, horizon)
@@ -216,7 +250,7 @@ class SegmentForecaster:
         future_X = np.tile(X[-1], (horizon, 1))
         forecast = model.predict(future_X)
         
-        return forecast
+        return forecast.astype(np.float32, copy=False)
     
     def ensemble_forecast(self, segment: DataSegment, horizon: int) -> Tuple[np.ndarray, float]:
         """
@@ -248,14 +282,14 @@ class SegmentForecaster:
         weights.append(0.3)
         
         # Weighted average
-        weights = np.array(weights) / sum(weights)
-        ensemble = np.average(forecasts, axis=0, weights=weights)
+        weights = np.array(weights, dtype=np.float32) / sum(weights)
+        ensemble = np.average(np.stack(forecasts, dtype=np.float32), axis=0, weights=weights)
         
         # Confidence based on forecast agreement
         if len(forecasts) > 1:
             std = np.std(forecasts, axis=0).mean()
             mean = np.mean(ensemble)
-            confidence = max(0, 1 - (std / mean)) if mean > 0 else 0.5
+            confidence = float(max(0, 1 - (std / mean))) if mean > 0 else 0.5
         else:
             confidence = 0.6  # Lower confidence for single model
         
@@ -300,7 +334,9 @@ class ForecastMerger:
             weight = sf['metadata'].get('size', 1) / total_weight
             weights.append(weight)
         
-        merged_forecast = np.average(forecasts, axis=0, weights=weights)
+        merged_forecast = np.average(
+            np.stack(forecasts, dtype=np.float32), axis=0, weights=np.asarray(weights, dtype=np.float32)
+        )
         avg_confidence = np.average([sf['confidence'] for sf in segment_forecasts], weights=weights)
         
         return {
@@ -315,8 +351,8 @@ class ForecastMerger:
         confidences = np.array([sf['confidence'] for sf in segment_forecasts])
         weights = confidences / confidences.sum()
         
-        forecasts = [sf['forecast'] for sf in segment_forecasts]
-        merged_forecast = np.average(forecasts, axis=0, weights=weights)
+        forecasts = np.stack([sf['forecast'] for sf in segment_forecasts], dtype=np.float32)
+        merged_forecast = np.average(forecasts, axis=0, weights=weights.astype(np.float32))
         
         return {
             'forecast': merged_forecast,
@@ -328,28 +364,27 @@ class ForecastMerger:
     
     def _hierarchical_merge(self, segment_forecasts: List[Dict]) -> Dict:
         """Hierarchical merge preserving segment structure"""
-        # Group by segment hierarchy
-        hierarchy = {}
-        for sf in segment_forecasts:
-            parts = sf['segment_id'].split('_')
-            key = '_'.join(parts[:2])  # Group by first two levels
-            
-            if key not in hierarchy:
-                hierarchy[key] = []
-            hierarchy[key].append(sf)
-        
-        # Merge within each group first
-        group_forecasts = []
-        for group_name, group_segments in hierarchy.items():
-            group_result = self._confidence_based(group_segments)
-            group_forecasts.append(group_result)
+        # Group by segment hierarchy (first two levels of the segment ID)
+        ids = pd.Series([sf['segment_id'] for sf in segment_forecasts])
+        keys = ids.str.split('_', n=2).str[:2].str.join('_')
+        hierarchy = pd.Series(np.arange(len(ids))).groupby(keys.values).indices
+        
+        forecasts = np.stack([sf['forecast'] for sf in segment_forecasts], dtype=np.float32)
+        confidences = np.array([sf['confidence'] for sf in segment_forecasts], dtype=np.float32)
+        
+        # Merge within each group first (confidence-weighted, as in _confidence_based)
+        final_forecasts = []
+        final_confidences = []
+        for idx in hierarchy.values():
+            group_confidences = confidences[idx]
+            final_forecasts.append(
+                np.average(forecasts[idx], axis=0, weights=group_confidences / group_confidences.sum())
+            )
+            final_confidences.append(float(group_confidences.max()))
         
         # Then merge across groups
-        final_forecasts = [gf['forecast'] for gf in group_forecasts]
-        final_confidences = [gf['confidence'] for gf in group_forecasts]
-        
-        weights = np.array(final_confidences) / sum(final_confidences)
-        merged_forecast = np.average(final_forecasts, axis=0, weights=weights)
+        weights = np.array(final_confidences, dtype=np.float32) / sum(final_confidences)
+        merged_forecast = np.average(np.stack(final_forecasts), axis=0, weights=weights)
         
         return {
             'forecast': merged_forecast,
@@ -435,3 +470,72 @@ class DivideAndConquerForecaster:
         logger.info(f"Forecast complete with confidence: {merged_result['confidence']:.2f}")
         
         return merged_result
+    
+    def forecast(
+        self,
+        df: pd.DataFrame,
+        target_date: datetime,
+        features: Optional[List[str]] = None
+    ) -> Dict:
+        """
+        Point forecast of a single price series at target_date
+        Used by the multi-modal predictors, whose history carries no route columns
+        
+        Args:
+            df: History with at least 'date' and 'price' columns
+            target_date: Date to forecast the price for
+            features: Exogenous columns available in df (not used by the ensemble yet)
+        
+        Returns:
+            Dictionary with price and confidence
+        """
+        return self.forecast_dates(df, [target_date], features=features)[0]
+    
+    def forecast_dates(
+        self,
+        df: pd.DataFrame,
+        target_dates: List[datetime],
+        features: Optional[List[str]] = None
+    ) -> List[Dict]:
+        """
+        Point forecasts of a single price series at several target dates from one ensemble run
+        The horizon is set by the furthest date; each date reads its own step of that forecast
+        
+        Returns:
+            List of dictionaries with price and confidence, in target_dates order
+        """
+        if not target_dates:
+            return []
+        
+        dates = df['date']
+        if not pd.api.types.is_datetime64_any_dtype(dates):
+            dates = pd.to_datetime(dates)
+        
+        last_date = self._naive_timestamp(dates.max())
+        steps = [max(1, (self._naive_timestamp(date) - last_date).days) for date in target_dates]
+        
+        result = self.predict(df, max(steps), segmentation_strategy='temporal')
+        confidence = float(result['confidence'])
+        
+        return [
+            {'price': float(result['forecast'][step - 1]), 'confidence': confidence}
+            for step in steps
+        ]
+    
+    def forecast_panel(self, panel: pd.DataFrame, target_date: datetime) -> Dict[str, Dict]:
+        """
+        Forecast every series of a panel indexed by (mode, date) in one call
+        
+        Returns:
+            Dictionary of mode -> forecast dict (as returned by forecast)
+        """
+        return {
+            mode: self.forecast(group.droplevel('mode').reset_index(), target_date)
+            for mode, group in panel.groupby(level='mode')
+        }
+    
+    @staticmethod
+    def _naive_timestamp(value) -> pd.Timestamp:
+        """Timestamp in naive UTC so DB (tz-aware) and request (naive) dates compare"""
+        ts = pd.Timestamp(value)
+        return ts.tz_convert(None) if ts.tzinfo is not None else ts
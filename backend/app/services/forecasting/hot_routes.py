@@ -0,0 +1,191 @@
+"""
+Hot-Route Forecast Cache
+Precomputes flight forecasts for the most-searched routes into Redis, so requests
+for those routes skip the history query and the forecaster entirely
+"""
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.models import Route, CabinClass
+
+logger = logging.getLogger(__name__)
+
+HOT_ROUTE_COUNT = 256                   # Top routes by Route.avg_daily_searches
+HOT_ROUTE_CABIN_CLASSES = (CabinClass.ECONOMY,)
+HOT_ROUTE_DAYS_AHEAD = 14               # Departure dates precomputed per route
+HOT_ROUTE_TTL_SECONDS = 15 * 60
+HOT_ROUTE_REFRESH_SECONDS = 5 * 60
+HOT_ROUTE_MAX_AGE_SECONDS = 60 * 60     # Entries older than this are recomputed / ignored
+HOT_ROUTE_MAX_OCCUPANCY_DRIFT = 0.10    # Relative occupancy shift that invalidates a route
+HOT_ROUTE_REDIS_TIMEOUT_SECONDS = 0.1   # Connect/read timeout, so an unreachable Redis is a fast miss
+HOT_ROUTE_LOCK_KEY = "hot_route:lock"
+HOT_ROUTE_LOCK_RENEW_SECONDS = 60       # How often a running refresh pushes its lock TTL back out
+
+_client: Optional[redis.Redis] = None
+
+
+def get_redis() -> redis.Redis:
+    """Shared Redis client (created on first use)"""
+    global _client
+    if _client is None:
+        _client = redis.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            socket_connect_timeout=HOT_ROUTE_REDIS_TIMEOUT_SECONDS,
+            socket_timeout=HOT_ROUTE_REDIS_TIMEOUT_SECONDS
+        )
+    return _client
+
+
+async def close_redis():
+    """Close the shared Redis client"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+def _route_key(origin: str, destination: str, cabin_class: CabinClass) -> str:
+    return f"hot_route:{origin}:{destination}:{CabinClass(cabin_class).value}"
+
+
+async def get_hot_route_prediction(
+    origin: str,
+    destination: str,
+    cabin_class: CabinClass,
+    departure_date: datetime
+) -> Optional[Dict]:
+    """
+    Cached flight prediction for a hot route, or None on a miss
+    Redis errors count as a miss so predictions never depend on the cache
+    """
+    if not settings.HOT_ROUTE_CACHE_ENABLED:
+        return None
+    
+    key = f"{_route_key(origin, destination, cabin_class)}:{departure_date.toordinal()}"
+    try:
+        raw = await get_redis().get(key)
+    except RedisError as e:
+        logger.warning(f"Hot-route cache unavailable: {e}")
+        return None
+    
+    if raw is None:
+        return None
+    
+    entry = json.loads(raw)
+    if time.time() - entry['generated_at'] > HOT_ROUTE_MAX_AGE_SECONDS:
+        return None
+    return entry['prediction']
+
+
+async def precompute_hot_routes() -> int:
+    """
+    Refresh cached forecasts for the HOT_ROUTE_COUNT most-searched routes
+    A route whose recent occupancy is within HOT_ROUTE_MAX_OCCUPANCY_DRIFT of the cached
+    value only has its TTL extended; otherwise all its departure dates are re-forecast
+    
+    Returns:
+        Number of routes re-forecast
+    """
+    # Imported here: the predictor itself consults this cache
+    from app.services.forecasting.universal_predictor import UniversalTravelPricePredictor
+    
+    client = get_redis()
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    departure_dates = [today + timedelta(days=d) for d in range(1, HOT_ROUTE_DAYS_AHEAD + 1)]
+    refreshed = 0
+    
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(Route.origin, Route.destination)
+            .order_by(Route.avg_daily_searches.desc())
+            .limit(HOT_ROUTE_COUNT)
+        )
+        routes = result.all()
+        predictor = UniversalTravelPricePredictor(db)
+        
+        for origin, destination in routes:
+            for cabin_class in HOT_ROUTE_CABIN_CLASSES:
+                route_key = _route_key(origin, destination, cabin_class)
+                df, stats = await predictor.fetch_flight_history(origin, destination, cabin_class)
+                if df.empty:
+                    continue
+                occupancy = float(df['occupancy'].tail(10).mean())
+                date_keys = [f"{route_key}:{date.toordinal()}" for date in departure_dates]
+                
+                meta = await client.get(f"{route_key}:meta")
+                if meta is not None:
+                    meta = json.loads(meta)
+                    fresh = time.time() - meta['generated_at'] < HOT_ROUTE_MAX_AGE_SECONDS
+                    drift = abs(occupancy - meta['occupancy']) / max(meta['occupancy'], 1e-6)
+                    if fresh and drift <= HOT_ROUTE_MAX_OCCUPANCY_DRIFT:
+                        async with client.pipeline(transaction=False) as pipe:
+                            for key in (f"{route_key}:meta", *date_keys):
+                                pipe.expire(key, HOT_ROUTE_TTL_SECONDS)
+                            await pipe.execute()
+                        continue
+                
+                predictions = await asyncio.to_thread(
+                    predictor.forecast_flight_history, df, stats, departure_dates
+                )
+                generated_at = time.time()
+                async with client.pipeline(transaction=False) as pipe:
+                    for key, prediction in zip(date_keys, predictions):
+                        pipe.set(
+                            key,
+                            json.dumps({'prediction': prediction, 'generated_at': generated_at}),
+                            ex=HOT_ROUTE_TTL_SECONDS
+                        )
+                    pipe.set(
+                        f"{route_key}:meta",
+                        json.dumps({'occupancy': occupancy, 'generated_at': generated_at}),
+                        ex=HOT_ROUTE_TTL_SECONDS
+                    )
+                    await pipe.execute()
+                refreshed += 1
+    
+    return refreshed
+
+
+async def _renew_lock(client: redis.Redis):
+    """Keep the refresh lock alive while a run (which may outlast one interval) is in progress"""
+    try:
+        while True:
+            await asyncio.sleep(HOT_ROUTE_LOCK_RENEW_SECONDS)
+            await client.expire(HOT_ROUTE_LOCK_KEY, HOT_ROUTE_REFRESH_SECONDS)
+    except RedisError as e:
+        logger.warning(f"Could not renew hot-route lock: {e}")
+
+
+async def run_hot_route_refresher():
+    """
+    Background loop for the app lifespan (when HOT_ROUTE_CACHE_ENABLED): refresh hot routes
+    every HOT_ROUTE_REFRESH_SECONDS
+    A Redis lock, renewed for as long as a run lasts, ensures only one worker process does the work
+    """
+    while True:
+        try:
+            client = get_redis()
+            if await client.set(HOT_ROUTE_LOCK_KEY, "1", nx=True, ex=HOT_ROUTE_REFRESH_SECONDS):
+                renewer = asyncio.create_task(_renew_lock(client))
+                try:
+                    refreshed = await precompute_hot_routes()
+                finally:
+                    renewer.cancel()
+                logger.info(f"Hot-route cache refreshed ({refreshed} routes re-forecast)")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Hot-route precompute failed: {e}")
+        
+        await asyncio.sleep(HOT_ROUTE_REFRESH_SECONDS)
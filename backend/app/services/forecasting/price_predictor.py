@@ -3,12 +3,13 @@ Price Predictor Service
 Integrates divide-and-conquer forecasting with database operations
 """
 
+import asyncio
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
-from typing import Optional, Dict, List
+from sqlalchemy import select, and_, func
+from typing import Optional, Dict, List, Tuple
 
 from app.models.models import Flight, FlightPrice, Route, ExternalFactor
 from app.services.forecasting.divide_conquer_engine import DivideAndConquerForecaster
@@ -50,36 +51,50 @@ class PricePredictor:
         # Step 2: Prepare data for forecasting
         df = self._prepare_forecast_data(historical_data)
         
-        # Step 3: Run divide-and-conquer forecast
-        forecast_result = self.forecaster.predict(
-            df=df,
-            horizon=horizon_days,
-            segmentation_strategy='hierarchical'  # Best for flight data
+        # Step 3: Start the current-price and factor lookups so the DB I/O overlaps
+        # the CPU-bound forecast below
+        context_task = asyncio.create_task(
+            self._fetch_price_context(origin, destination, airline, departure_date)
         )
         
-        # Step 4: Get current price
-        current_price = await self._get_current_price(origin, destination, airline)
+        # Step 4: Run divide-and-conquer forecast off the event loop
+        try:
+            forecast_result = await asyncio.to_thread(
+                self.forecaster.predict,
+                df=df,
+                horizon=horizon_days,
+                segmentation_strategy='hierarchical'  # Best for flight data
+            )
+        except BaseException:
+            context_task.cancel()
+            raise
+        
+        # Keep the raw forecast as an array so the summary steps below scan it in NumPy
+        forecast_np = np.asarray(forecast_result['forecast'][:horizon_days], dtype=float)
+        current_date = datetime.utcnow()
+        
+        # Step 5: Collect current price and influencing factors
+        current_price, factors = await context_task
         
-        # Step 5: Generate price timeline
+        # Step 6: Generate price timeline
         predicted_prices = self._generate_price_timeline(
-            forecast_result['forecast'],
+            forecast_np,
             departure_date,
-            horizon_days
+            horizon_days,
+            current_date
         )
         
-        # Step 6: Calculate optimal booking date
+        # Step 7: Calculate optimal booking date
         optimal_date, expected_savings = self._calculate_optimal_booking(
-            predicted_prices,
+            forecast_np,
+            current_date,
             current_price
         )
         
-        # Step 7: Analyze influencing factors
-        factors = await self._analyze_price_factors(origin, destination, departure_date)
-        
         # Step 8: Generate recommendation
         recommendation = self._generate_recommendation(
             current_price,
-            predicted_prices,
+            forecast_np,
             forecast_result['confidence']
         )
         
@@ -109,7 +124,18 @@ class PricePredictor:
         """Fetch historical price data from database"""
         cutoff_date = datetime.utcnow() - timedelta(days=days_back)
         
-        query = select(FlightPrice, Flight).join(Flight).where(
+        # Select only the columns we use: Core row tuples skip ORM object hydration
+        query = select(
+            FlightPrice.price_date.label('date'),
+            FlightPrice.current_price.label('price'),
+            Flight.origin,
+            Flight.destination,
+            Flight.airline,
+            func.coalesce(FlightPrice.time_to_departure_days, 0).label('days_to_departure'),
+            func.coalesce(FlightPrice.occupancy_rate, 0.5).label('occupancy_rate'),
+            FlightPrice.demand_multiplier,
+            FlightPrice.seasonality_factor
+        ).join(Flight).where(
             and_(
                 Flight.origin == origin.upper(),
                 Flight.destination == destination.upper(),
@@ -121,23 +147,18 @@ class PricePredictor:
             query = query.where(Flight.airline == airline)
         
         result = await self.db.execute(query)
+        keys = list(result.keys())
         rows = result.all()
         
-        data = []
-        for price, flight in rows:
-            data.append({
-                'date': price.price_date,
-                'price': price.current_price,
-                'origin': flight.origin,
-                'destination': flight.destination,
-                'airline': flight.airline,
-                'days_to_departure': price.time_to_departure_days or 0,
-                'occupancy_rate': price.occupancy_rate or 0.5,
-                'demand_multiplier': price.demand_multiplier,
-                'seasonality_factor': price.seasonality_factor
-            })
+        # Build column-wise from the row tuples
+        data = dict(zip(keys, zip(*rows))) if rows else dict.fromkeys(keys, ())
         
-        return pd.DataFrame(data)
+        df = pd.DataFrame(data)
+        if not df.empty:
+            # Parse once at ingestion so downstream code can use the .dt accessor directly
+            df['date'] = pd.to_datetime(df['date'])
+        
+        return df
     
     def _prepare_forecast_data(self, df: pd.DataFrame) -> pd.DataFrame:
         """Prepare data for forecasting engine"""
@@ -148,8 +169,8 @@ class PricePredictor:
         df = df.sort_values('date')
         
         # Add time features
-        df['day_of_week'] = pd.to_datetime(df['date']).dt.dayofweek
-        df['month'] = pd.to_datetime(df['date']).dt.month
+        df['day_of_week'] = df['date'].dt.dayofweek
+        df['month'] = df['date'].dt.month
         df['is_weekend'] = df['day_of_week'].isin([5, 6]).astype(int)
         
         # Fill missing values
@@ -157,6 +178,18 @@ class PricePredictor:
         
         return df
     
+    async def _fetch_price_context(
+        self,
+        origin: str,
+        destination: str,
+        airline: Optional[str],
+        departure_date: datetime
+    ) -> Tuple[float, Dict]:
+        """Fetch current price and price factors (sequential: they share one session)"""
+        current_price = await self._get_current_price(origin, destination, airline)
+        factors = await self._analyze_price_factors(origin, destination, departure_date)
+        return current_price, factors
+    
     async def _get_current_price(
         self,
         origin: str,
@@ -184,11 +217,12 @@ class PricePredictor:
         self,
         forecast: List[float],
         departure_date: datetime,
-        horizon_days: int
+        horizon_days: int,
+        current_date: Optional[datetime] = None
     ) -> List[Dict]:
         """Generate timeline of predicted prices"""
         timeline = []
-        current_date = datetime.utcnow()
+        current_date = current_date or datetime.utcnow()
         
         for i, price in enumerate(forecast[:horizon_days]):
             date = current_date + timedelta(days=i)
@@ -209,17 +243,18 @@ class PricePredictor:
     
     def _calculate_optimal_booking(
         self,
-        predicted_prices: List[Dict],
+        forecast_np: np.ndarray,
+        current_date: datetime,
         current_price: float
     ) -> tuple:
         """Calculate optimal booking date and expected savings"""
-        if not predicted_prices:
-            return datetime.utcnow(), 0.0
+        if forecast_np.size == 0:
+            return current_date, 0.0
         
         # Find minimum price in forecast
-        min_price_entry = min(predicted_prices, key=lambda x: x['price'])
-        optimal_date = datetime.fromisoformat(min_price_entry['date'])
-        min_price = min_price_entry['price']
+        argmin = int(forecast_np.argmin())
+        optimal_date = current_date + timedelta(days=argmin)
+        min_price = round(float(forecast_np[argmin]), 2)
         
         # Calculate savings
         expected_savings = current_price - min_price
@@ -257,15 +292,16 @@ class PricePredictor:
     def _generate_recommendation(
         self,
         current_price: float,
-        predicted_prices: List[Dict],
+        forecast_np: np.ndarray,
         confidence: float
     ) -> str:
         """Generate booking recommendation"""
-        if not predicted_prices:
+        if forecast_np.size == 0:
             return "Insufficient data for recommendation"
         
-        min_price = min(p['price'] for p in predicted_prices)
-        avg_price = np.mean([p['price'] for p in predicted_prices])
+        argmin = int(forecast_np.argmin())
+        min_price = float(forecast_np[argmin])
+        avg_price = float(forecast_np.mean())
         
         if current_price <= min_price * 1.05:  # Within 5% of minimum
             return f"✅ BOOK NOW - Current price (₹{current_price:.0f}) is excellent. Prices may increase."
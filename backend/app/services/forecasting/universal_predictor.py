@@ -2,18 +2,205 @@
 Universal Price Predictor for All Travel Modes
 Extends the divide-and-conquer engine to handle flights, trains, buses, hotels, and car rentals
 """
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Mapping, Optional, Tuple
 from datetime import datetime, timedelta
+from types import MappingProxyType
+import asyncio
+import bisect
+import enum
+import functools
+import inspect
+import time
 import pandas as pd
 import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import select, and_, bindparam, cast, func, literal, null, union_all, Integer
+from sqlalchemy.sql import Select
 
 from app.models.models import (
     Flight, FlightPrice, Train, TrainPrice, Bus, BusPrice,
-    Hotel, HotelPrice, CarRental, CarRentalPrice, TravelMode
+    Hotel, HotelRoom, HotelPrice, CarRental, CarRentalPrice, TravelMode,
+    CabinClass, TrainClass, BusType, HotelCategory, RoomType, CarType
 )
 from app.services.forecasting.divide_conquer_engine import DivideAndConquerForecaster
+from app.services.forecasting.hot_routes import get_hot_route_prediction
+
+
+PREDICTION_CACHE_TTL_SECONDS = 60
+
+# Holds no per-call state, so one instance serves every predictor and worker thread
+SHARED_FORECASTER = DivideAndConquerForecaster()
+
+# Rows per server-side cursor fetch for the (up to 1000-row) hotel history
+HOTEL_STREAM_CHUNK_SIZE = 256
+
+# Price-to-average ratio bands and their booking advice (band i is [T[i-1], T[i]))
+RECOMMENDATION_THRESHOLDS = (0.85, 0.95, 1.05, 1.15)
+RECOMMENDATIONS = (
+    "Excellent price! Book now.",
+    "Good deal. Consider booking.",
+    "Average price. Book if convenient.",
+    "Slightly expensive. Consider waiting.",
+    "High price. Wait for better rates."
+)
+TRENDS = ("decreasing", "stable", "increasing")
+
+# Fallback prices when a mode has no history (built once at import, read-only)
+HOTEL_BASE_PRICES: Mapping[HotelCategory, int] = MappingProxyType({
+    HotelCategory.BUDGET: 1000,
+    HotelCategory.THREE_STAR: 2500,
+    HotelCategory.FOUR_STAR: 5000,
+    HotelCategory.FIVE_STAR: 10000,
+    HotelCategory.LUXURY: 20000
+})
+CAR_BASE_PRICES: Mapping[CarType, int] = MappingProxyType({
+    CarType.HATCHBACK: 1200,
+    CarType.SEDAN: 1800,
+    CarType.SUV: 3000,
+    CarType.LUXURY: 6000,
+    CarType.VAN: 2500
+})
+
+
+def _memoized_prediction(method):
+    """
+    Memoize a predict_* coroutine per predictor instance for a short TTL
+    Dates are keyed by ordinal day, so repeated calls within a request reuse the result
+    Enum-annotated arguments are coerced at this boundary, so plain strings ("economy")
+    and members (CabinClass.ECONOMY) share a cache entry and typos raise ValueError
+    """
+    signature = inspect.signature(method)
+    enum_params = {
+        name: param.annotation for name, param in signature.parameters.items()
+        if isinstance(param.annotation, type) and issubclass(param.annotation, enum.Enum)
+    }
+    
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        bound = signature.bind(self, *args, **kwargs)
+        bound.apply_defaults()
+        for name, enum_cls in enum_params.items():
+            bound.arguments[name] = enum_cls(bound.arguments[name])
+        key = (method.__name__,) + tuple(
+            value.toordinal() if isinstance(value, datetime) else value
+            for name, value in bound.arguments.items() if name != 'self'
+        )
+        
+        now = time.monotonic()
+        cached = self._prediction_cache.get(key)
+        if cached and now - cached[0] < PREDICTION_CACHE_TTL_SECONDS:
+            return cached[1]
+        
+        result = await method(*bound.args, **bound.kwargs)
+        self._prediction_cache[key] = (now, result)
+        return result
+    
+    return wrapper
+
+
+def _with_price_stats(query) -> Select:
+    """
+    Wrap a mode-tagged history query so the database also returns each mode's overall
+    and last-10 average price as window columns, in the same round-trip as the rows
+    """
+    rows = query.subquery('price_rows')
+    row_number = func.row_number().over(partition_by=rows.c.mode, order_by=rows.c.date.desc())
+    ranked = select(rows, row_number.label('rn')).subquery('ranked_rows')
+    
+    return select(
+        *(ranked.c[name] for name in rows.c.keys()),
+        func.avg(ranked.c.price).over(partition_by=ranked.c.mode).label('overall_avg'),
+        func.avg(ranked.c.price).filter(ranked.c.rn <= 10).over(
+            partition_by=ranked.c.mode
+        ).label('recent_avg')
+    ).order_by(ranked.c.mode, ranked.c.date)
+
+
+# Per-mode price history projected into the common (mode, date, price, occupancy, days_before)
+# schema. Built once at import; request values are supplied as bind parameters at execution
+FLIGHT_PRICES = select(
+    literal('flight').label('mode'),
+    FlightPrice.price_date.label('date'),
+    FlightPrice.current_price.label('price'),
+    FlightPrice.occupancy_rate.label('occupancy'),
+    FlightPrice.time_to_departure_days.label('days_before')
+).join(Flight).where(
+    and_(
+        Flight.origin == bindparam('origin'),
+        Flight.destination == bindparam('destination'),
+        Flight.cabin_class == bindparam('cabin_class')
+    )
+)
+
+TRAIN_PRICES = select(
+    literal('train').label('mode'),
+    TrainPrice.booking_date.label('date'),
+    TrainPrice.price.label('price'),
+    TrainPrice.occupancy_rate.label('occupancy'),
+    cast(null(), Integer).label('days_before')
+).join(Train).where(
+    and_(
+        Train.origin_station == bindparam('origin'),
+        Train.destination_station == bindparam('destination'),
+        Train.train_class == bindparam('train_class')
+    )
+)
+
+BUS_PRICES = select(
+    literal('bus').label('mode'),
+    BusPrice.booking_date.label('date'),
+    BusPrice.price.label('price'),
+    BusPrice.occupancy_rate.label('occupancy'),
+    cast(null(), Integer).label('days_before')
+).join(Bus).where(
+    and_(
+        Bus.origin_city == bindparam('origin'),
+        Bus.destination_city == bindparam('destination'),
+        Bus.bus_type == bindparam('bus_type')
+    )
+)
+
+# Latest 1000 rows of hotel history for a city and category
+HOTEL_PRICES = select(
+    literal('hotel').label('mode'),
+    HotelPrice.stay_date.label('date'),
+    HotelPrice.price_per_night.label('price'),
+    HotelPrice.occupancy_rate.label('occupancy'),
+    cast(null(), Integer).label('days_before')
+).join(HotelRoom).join(Hotel).where(
+    and_(
+        Hotel.city == bindparam('city'),
+        Hotel.category == bindparam('hotel_category')
+    )
+).order_by(HotelPrice.created_at.desc()).limit(1000)
+
+CAR_RENTAL_PRICES = select(
+    literal('car_rental').label('mode'),
+    CarRentalPrice.rental_start_date.label('date'),
+    CarRentalPrice.price_per_day.label('price'),
+    CarRentalPrice.utilization_rate.label('occupancy'),
+    cast(null(), Integer).label('days_before')
+).join(CarRental).where(
+    and_(
+        CarRental.pickup_city == bindparam('city'),
+        CarRental.car_type == bindparam('car_type')
+    )
+)
+
+# Full history statements (rows + per-mode price stats) executed by the predictor
+FLIGHT_HISTORY_STMT = _with_price_stats(FLIGHT_PRICES)
+TRAIN_HISTORY_STMT = _with_price_stats(TRAIN_PRICES)
+BUS_HISTORY_STMT = _with_price_stats(BUS_PRICES)
+HOTEL_HISTORY_STMT = _with_price_stats(HOTEL_PRICES)
+CAR_RENTAL_HISTORY_STMT = _with_price_stats(CAR_RENTAL_PRICES)
+
+# compare_all_modes: flight + train + bus between two cities in one round-trip
+MODE_COMPARISON_STMT = _with_price_stats(union_all(FLIGHT_PRICES, TRAIN_PRICES, BUS_PRICES))
+
+# predict_vacation_components: flight + destination hotel + destination car rental
+VACATION_PANEL_STMT = _with_price_stats(
+    union_all(FLIGHT_PRICES, select(HOTEL_PRICES.subquery()), CAR_RENTAL_PRICES)
+)
 
 
 class UniversalTravelPricePredictor:
@@ -24,46 +211,88 @@ class UniversalTravelPricePredictor:
     
     def __init__(self, db: AsyncSession):
         self.db = db
-        self.forecaster = DivideAndConquerForecaster()
+        # An AsyncSession runs one statement at a time; concurrent predict_* calls
+        # queue their fetches here and overlap only in the forecasting stage
+        self._db_lock = asyncio.Lock()
+        self.forecaster = SHARED_FORECASTER
+        # {(method, *args): (monotonic_ts, prediction)}
+        self._prediction_cache: Dict[tuple, Tuple[float, Dict]] = {}
     
+    @_memoized_prediction
     async def predict_flight_price(
         self,
         origin: str,
         destination: str,
         departure_date: datetime,
-        cabin_class: str = "economy"
+        cabin_class: CabinClass = CabinClass.ECONOMY
     ) -> Dict:
         """Predict flight price using historical data"""
         
-        # Fetch historical flight prices
-        query = select(FlightPrice).join(Flight).where(
-            and_(
-                Flight.origin == origin,
-                Flight.destination == destination,
-                Flight.cabin_class == cabin_class
-            )
-        ).order_by(FlightPrice.created_at)
+        # Most-searched routes are precomputed by the hot-route refresher
+        cached = await get_hot_route_prediction(origin, destination, cabin_class, departure_date)
+        if cached is not None:
+            return cached
         
-        result = await self.db.execute(query)
-        prices = result.scalars().all()
+        # Fetch historical flight prices
+        df, stats = await self.fetch_flight_history(origin, destination, cabin_class)
+        forecast = await self._forecast_off_loop(df, departure_date, features=['occupancy', 'days_before'])
         
-        if not prices:
+        return self._forecast_flight_price(df, stats, departure_date, forecast=forecast)
+    
+    async def fetch_flight_history(
+        self,
+        origin: str,
+        destination: str,
+        cabin_class: CabinClass
+    ) -> Tuple[pd.DataFrame, Optional[Tuple[float, float]]]:
+        """Flight price history for a route and its (overall_avg, recent_avg) price stats"""
+        return await self._fetch_prices_df(
+            FLIGHT_HISTORY_STMT,
+            {'origin': origin, 'destination': destination, 'cabin_class': cabin_class}
+        )
+    
+    def forecast_flight_history(
+        self,
+        df: pd.DataFrame,
+        stats: Optional[Tuple[float, float]],
+        departure_dates: List[datetime]
+    ) -> List[Dict]:
+        """
+        Flight predictions for several departure dates from one fetched history (CPU-bound)
+        The ensemble runs once, to the furthest date, rather than once per date
+        """
+        if df.empty:
+            forecasts = [None] * len(departure_dates)
+        else:
+            forecasts = self.forecaster.forecast_dates(
+                df, departure_dates, features=['occupancy', 'days_before']
+            )
+        return [
+            self._forecast_flight_price(df, stats, date, forecast=forecast)
+            for date, forecast in zip(departure_dates, forecasts)
+        ]
+    
+    def _forecast_flight_price(
+        self,
+        df: pd.DataFrame,
+        stats: Optional[Tuple[float, float]],
+        departure_date: datetime,
+        forecast: Optional[Dict] = None
+    ) -> Dict:
+        """
+        Forecast flight price from fetched history (or a precomputed forecast)
+        stats is the (overall_avg, recent_avg) price pair computed by the database
+        """
+        if df.empty:
             return {"error": "No historical data available"}
         
-        # Convert to DataFrame
-        df = pd.DataFrame([{
-            'date': p.created_at,
-            'price': p.current_price,
-            'occupancy': p.occupancy_rate,
-            'days_before': p.time_to_departure_days
-        } for p in prices])
-        
         # Apply divide-and-conquer forecasting
-        forecast = self.forecaster.forecast(
-            df,
-            target_date=departure_date,
-            features=['occupancy', 'days_before']
-        )
+        if forecast is None:
+            forecast = self.forecaster.forecast(
+                df,
+                target_date=departure_date,
+                features=['occupancy', 'days_before']
+            )
         
         return {
             "travel_mode": "flight",
@@ -73,30 +302,36 @@ class UniversalTravelPricePredictor:
                 "min": forecast['price'] * 0.90,
                 "max": forecast['price'] * 1.10
             },
-            "recommendation": self._get_recommendation(forecast['price'], df['price'].mean())
+            "recommendation": self._get_recommendation(forecast['price'], stats[0])
         }
     
+    @_memoized_prediction
     async def predict_train_price(
         self,
         origin_station: str,
         destination_station: str,
         travel_date: datetime,
-        train_class: str = "sleeper"
+        train_class: TrainClass = TrainClass.SLEEPER
     ) -> Dict:
         """Predict train price"""
         
-        query = select(TrainPrice).join(Train).where(
-            and_(
-                Train.origin_station == origin_station,
-                Train.destination_station == destination_station,
-                Train.train_class == train_class
-            )
-        ).order_by(TrainPrice.created_at)
-        
-        result = await self.db.execute(query)
-        prices = result.scalars().all()
+        df, stats = await self._fetch_prices_df(
+            TRAIN_HISTORY_STMT,
+            {'origin': origin_station, 'destination': destination_station, 'train_class': train_class}
+        )
+        forecast = await self._forecast_off_loop(df, travel_date)
         
-        if not prices:
+        return self._forecast_train_price(df, stats, travel_date, forecast=forecast)
+    
+    def _forecast_train_price(
+        self,
+        df: pd.DataFrame,
+        stats: Optional[Tuple[float, float]],
+        travel_date: datetime,
+        forecast: Optional[Dict] = None
+    ) -> Dict:
+        """Forecast train price from fetched history (or a precomputed forecast)"""
+        if df.empty:
             # Fallback: use average train prices
             return {
                 "travel_mode": "train",
@@ -105,44 +340,44 @@ class UniversalTravelPricePredictor:
                 "message": "Limited historical data"
             }
         
-        df = pd.DataFrame([{
-            'date': p.booking_date,
-            'price': p.price,
-            'occupancy': p.occupancy_rate,
-            'seats_sold': p.seats_sold
-        } for p in prices])
-        
-        forecast = self.forecaster.forecast(df, target_date=travel_date)
+        if forecast is None:
+            forecast = self.forecaster.forecast(df, target_date=travel_date)
         
         return {
             "travel_mode": "train",
             "predicted_price": forecast['price'],
             "confidence": forecast['confidence'],
-            "price_trend": self._calculate_trend(df['price']),
-            "recommendation": self._get_recommendation(forecast['price'], df['price'].mean())
+            "price_trend": self._calculate_trend(*stats),
+            "recommendation": self._get_recommendation(forecast['price'], stats[0])
         }
     
+    @_memoized_prediction
     async def predict_bus_price(
         self,
         origin_city: str,
         destination_city: str,
         travel_date: datetime,
-        bus_type: str = "seater"
+        bus_type: BusType = BusType.SEATER
     ) -> Dict:
         """Predict bus price"""
         
-        query = select(BusPrice).join(Bus).where(
-            and_(
-                Bus.origin_city == origin_city,
-                Bus.destination_city == destination_city,
-                Bus.bus_type == bus_type
-            )
-        ).order_by(BusPrice.created_at)
-        
-        result = await self.db.execute(query)
-        prices = result.scalars().all()
+        df, stats = await self._fetch_prices_df(
+            BUS_HISTORY_STMT,
+            {'origin': origin_city, 'destination': destination_city, 'bus_type': bus_type}
+        )
+        forecast = await self._forecast_off_loop(df, travel_date)
         
-        if not prices:
+        return self._forecast_bus_price(df, stats, travel_date, forecast=forecast)
+    
+    def _forecast_bus_price(
+        self,
+        df: pd.DataFrame,
+        stats: Optional[Tuple[float, float]],
+        travel_date: datetime,
+        forecast: Optional[Dict] = None
+    ) -> Dict:
+        """Forecast bus price from fetched history (or a precomputed forecast)"""
+        if df.empty:
             return {
                 "travel_mode": "bus",
                 "predicted_price": 300.0,
@@ -150,54 +385,55 @@ class UniversalTravelPricePredictor:
                 "message": "Limited historical data"
             }
         
-        df = pd.DataFrame([{
-            'date': p.booking_date,
-            'price': p.price,
-            'occupancy': p.occupancy_rate
-        } for p in prices])
-        
-        forecast = self.forecaster.forecast(df, target_date=travel_date)
+        if forecast is None:
+            forecast = self.forecaster.forecast(df, target_date=travel_date)
         
         return {
             "travel_mode": "bus",
             "predicted_price": forecast['price'],
             "confidence": forecast['confidence'],
-            "recommendation": self._get_recommendation(forecast['price'], df['price'].mean())
+            "recommendation": self._get_recommendation(forecast['price'], stats[0])
         }
     
+    @_memoized_prediction
     async def predict_hotel_price(
         self,
         city: str,
         check_in_date: datetime,
         check_out_date: datetime,
-        hotel_category: str = "three_star",
-        room_type: str = "double"
+        hotel_category: HotelCategory = HotelCategory.THREE_STAR,
+        room_type: RoomType = RoomType.DOUBLE
     ) -> Dict:
         """Predict hotel price per night"""
         
-        # Calculate number of nights
-        nights = (check_out_date - check_in_date).days
+        df, stats = await self._fetch_prices_df(
+            HOTEL_HISTORY_STMT,
+            {'city': city, 'hotel_category': hotel_category},
+            stream_chunk=HOTEL_STREAM_CHUNK_SIZE
+        )
+        forecast = await self._forecast_off_loop(df, check_in_date, features=['occupancy'])
         
-        query = select(HotelPrice).join(Hotel).where(
-            and_(
-                Hotel.city == city,
-                Hotel.category == hotel_category
-            )
-        ).order_by(HotelPrice.created_at).limit(1000)
+        return self._forecast_hotel_price(
+            df, stats, check_in_date, check_out_date, hotel_category, forecast=forecast
+        )
+    
+    def _forecast_hotel_price(
+        self,
+        df: pd.DataFrame,
+        stats: Optional[Tuple[float, float]],
+        check_in_date: datetime,
+        check_out_date: datetime,
+        hotel_category: HotelCategory,
+        forecast: Optional[Dict] = None
+    ) -> Dict:
+        """Forecast hotel price from fetched history (or a precomputed forecast)"""
         
-        result = await self.db.execute(query)
-        prices = result.scalars().all()
+        # Calculate number of nights
+        nights = check_out_date.toordinal() - check_in_date.toordinal()
         
-        if not prices:
+        if df.empty:
             # Default pricing based on category
-            base_prices = {
-                "budget": 1000,
-                "three_star": 2500,
-                "four_star": 5000,
-                "five_star": 10000,
-                "luxury": 20000
-            }
-            price_per_night = base_prices.get(hotel_category, 2500)
+            price_per_night = HOTEL_BASE_PRICES.get(hotel_category, 2500)
             
             return {
                 "travel_mode": "hotel",
@@ -208,21 +444,15 @@ class UniversalTravelPricePredictor:
                 "message": "Estimated pricing"
             }
         
-        df = pd.DataFrame([{
-            'date': p.stay_date,
-            'price': p.price_per_night,
-            'occupancy': p.occupancy_rate,
-            'is_weekend': p.is_weekend
-        } for p in prices])
-        
         # Check if check-in is weekend
         is_weekend = check_in_date.weekday() >= 5
         
-        forecast = self.forecaster.forecast(
-            df, 
-            target_date=check_in_date,
-            features=['occupancy', 'is_weekend']
-        )
+        if forecast is None:
+            forecast = self.forecaster.forecast(
+                df, 
+                target_date=check_in_date,
+                features=['occupancy']
+            )
         
         price_per_night = forecast['price']
         
@@ -237,38 +467,41 @@ class UniversalTravelPricePredictor:
             "nights": nights,
             "confidence": forecast['confidence'],
             "is_weekend": is_weekend,
-            "recommendation": self._get_recommendation(price_per_night, df['price'].mean())
+            "recommendation": self._get_recommendation(price_per_night, stats[0])
         }
     
+    @_memoized_prediction
     async def predict_car_rental_price(
         self,
         pickup_city: str,
         rental_start_date: datetime,
         rental_duration_days: int,
-        car_type: str = "sedan"
+        car_type: CarType = CarType.SEDAN
     ) -> Dict:
         """Predict car rental price"""
         
-        query = select(CarRentalPrice).join(CarRental).where(
-            and_(
-                CarRental.pickup_city == pickup_city,
-                CarRental.car_type == car_type
-            )
-        ).order_by(CarRentalPrice.created_at)
-        
-        result = await self.db.execute(query)
-        prices = result.scalars().all()
+        df, stats = await self._fetch_prices_df(
+            CAR_RENTAL_HISTORY_STMT, {'city': pickup_city, 'car_type': car_type}
+        )
+        forecast = await self._forecast_off_loop(df, rental_start_date)
         
-        if not prices:
+        return self._forecast_car_rental_price(
+            df, stats, rental_start_date, rental_duration_days, car_type, forecast=forecast
+        )
+    
+    def _forecast_car_rental_price(
+        self,
+        df: pd.DataFrame,
+        stats: Optional[Tuple[float, float]],
+        rental_start_date: datetime,
+        rental_duration_days: int,
+        car_type: CarType,
+        forecast: Optional[Dict] = None
+    ) -> Dict:
+        """Forecast car rental price from fetched history (or a precomputed forecast)"""
+        if df.empty:
             # Default pricing by car type
-            base_prices = {
-                "hatchback": 1200,
-                "sedan": 1800,
-                "suv": 3000,
-                "luxury": 6000,
-                "van": 2500
-            }
-            price_per_day = base_prices.get(car_type, 1800)
+            price_per_day = CAR_BASE_PRICES.get(car_type, 1800)
             
             return {
                 "travel_mode": "car_rental",
@@ -279,14 +512,8 @@ class UniversalTravelPricePredictor:
                 "message": "Estimated pricing"
             }
         
-        df = pd.DataFrame([{
-            'date': p.rental_start_date,
-            'price': p.price_per_day,
-            'duration': p.rental_duration_days,
-            'utilization': p.utilization_rate
-        } for p in prices])
-        
-        forecast = self.forecaster.forecast(df, target_date=rental_start_date)
+        if forecast is None:
+            forecast = self.forecaster.forecast(df, target_date=rental_start_date)
         
         price_per_day = forecast['price']
         
@@ -303,9 +530,39 @@ class UniversalTravelPricePredictor:
             "duration_days": rental_duration_days,
             "confidence": forecast['confidence'],
             "discount_applied": rental_duration_days >= 3,
-            "recommendation": self._get_recommendation(price_per_day, df['price'].mean())
+            "recommendation": self._get_recommendation(price_per_day, stats[0])
         }
     
+    async def predict_vacation_components(
+        self,
+        origin: str,
+        destination: str,
+        departure_date: datetime,
+        return_date: datetime
+    ) -> Tuple[Dict, Dict, Dict]:
+        """
+        Predict flight + hotel + car for a vacation with one panel fetch and one forecaster call
+        Uses the same defaults as the individual predictors (economy, three_star, sedan)
+        """
+        panel, stats = await self._fetch_panel(origin, destination)
+        forecasts = await asyncio.to_thread(self.forecaster.forecast_panel, panel, departure_date)
+        frames = self._split_modes(panel.reset_index(), ('flight', 'hotel', 'car_rental'))
+        
+        flight_pred = self._forecast_flight_price(
+            frames['flight'], stats.get('flight'), departure_date, forecast=forecasts.get('flight')
+        )
+        hotel_pred = self._forecast_hotel_price(
+            frames['hotel'], stats.get('hotel'), departure_date, return_date, HotelCategory.THREE_STAR,
+            forecast=forecasts.get('hotel')
+        )
+        car_pred = self._forecast_car_rental_price(
+            frames['car_rental'], stats.get('car_rental'), departure_date,
+            return_date.toordinal() - departure_date.toordinal(), CarType.SEDAN,
+            forecast=forecasts.get('car_rental')
+        )
+        
+        return flight_pred, hotel_pred, car_pred
+    
     async def compare_all_modes(
         self,
         origin: str,
@@ -317,67 +574,180 @@ class UniversalTravelPricePredictor:
         """
         results = {}
         
-        # Predict flight price
-        try:
-            results['flight'] = await self.predict_flight_price(origin, destination, travel_date)
-        except Exception as e:
-            results['flight'] = {"error": str(e)}
-        
-        # Predict train price
+        # One round-trip for all three modes instead of one query per predictor
         try:
-            results['train'] = await self.predict_train_price(origin, destination, travel_date)
+            frames, stats = await self._fetch_mode_frames(origin, destination)
         except Exception as e:
-            results['train'] = {"error": str(e)}
+            return {mode: {"error": str(e)} for mode in ('flight', 'train', 'bus')}
         
-        # Predict bus price
-        try:
-            results['bus'] = await self.predict_bus_price(origin, destination, travel_date)
-        except Exception as e:
-            results['bus'] = {"error": str(e)}
-        
-        # Find cheapest option
-        valid_options = {k: v for k, v in results.items() if 'error' not in v}
-        if valid_options:
-            cheapest = min(valid_options.items(), key=lambda x: x[1]['predicted_price'])
+        # The rows are already fetched; run the CPU-bound per-mode forecasts concurrently
+        forecasters = {
+            'flight': self._forecast_flight_price,
+            'train': self._forecast_train_price,
+            'bus': self._forecast_bus_price
+        }
+        predictions = await asyncio.gather(
+            *(
+                asyncio.to_thread(forecast_fn, frames[mode], stats.get(mode), travel_date)
+                for mode, forecast_fn in forecasters.items()
+            ),
+            return_exceptions=True
+        )
+        for mode, prediction in zip(forecasters, predictions):
+            if isinstance(prediction, Exception):
+                results[mode] = {"error": str(prediction)}
+            else:
+                results[mode] = prediction
+        
+        # Find cheapest option (errored modes score +inf)
+        modes = ('flight', 'train', 'bus')
+        prices = np.array([results[mode].get('predicted_price', np.inf) for mode in modes], dtype=float)
+        cheapest_idx = int(np.argmin(prices))
+        if np.isfinite(prices[cheapest_idx]):
+            savings = prices - prices[cheapest_idx]
             results['recommendation'] = {
-                "cheapest_mode": cheapest[0],
-                "cheapest_price": cheapest[1]['predicted_price'],
-                "savings_vs_alternatives": {}
+                "cheapest_mode": modes[cheapest_idx],
+                "cheapest_price": results[modes[cheapest_idx]]['predicted_price'],
+                "savings_vs_alternatives": {
+                    modes[i]: float(savings[i])
+                    for i in range(len(modes))
+                    if i != cheapest_idx and np.isfinite(prices[i])
+                }
             }
-            
-            for mode, data in valid_options.items():
-                if mode != cheapest[0]:
-                    savings = data['predicted_price'] - cheapest[1]['predicted_price']
-                    results['recommendation']['savings_vs_alternatives'][mode] = savings
         
         return results
     
-    def _calculate_trend(self, prices: pd.Series) -> str:
-        """Calculate price trend"""
-        if len(prices) < 2:
-            return "stable"
-        
-        recent_avg = prices.tail(10).mean()
-        overall_avg = prices.mean()
-        
-        if recent_avg > overall_avg * 1.1:
-            return "increasing"
-        elif recent_avg < overall_avg * 0.9:
-            return "decreasing"
-        else:
-            return "stable"
+    async def _query_df(
+        self,
+        query: Select,
+        params: Dict,
+        stream_chunk: Optional[int] = None
+    ) -> pd.DataFrame:
+        """
+        Execute a column-projected query with its bind parameters into a DataFrame, built column by column
+        With stream_chunk, rows are read through a server-side cursor in chunks of that size
+        """
+        if stream_chunk:
+            return await self._stream_query_df(query, params, stream_chunk)
+        
+        result = await self.db.execute(query, params)
+        keys = list(result.keys())
+        rows = result.all()
+        
+        # Transpose the row tuples once instead of building a dict per row
+        columns = dict(zip(keys, zip(*rows))) if rows else dict.fromkeys(keys, ())
+        if 'price' in columns:
+            columns['price'] = np.asarray(columns['price'], dtype=np.float32)
+        return pd.DataFrame(columns)
+    
+    async def _stream_query_df(self, query: Select, params: Dict, chunk_size: int) -> pd.DataFrame:
+        """Stream a column-projected query and transpose each chunk into column arrays"""
+        result = await self.db.stream(query, params, execution_options={'yield_per': chunk_size})
+        keys = list(result.keys())
+        
+        chunks: Dict[str, list] = {key: [] for key in keys}
+        async for partition in result.partitions(chunk_size):
+            for key, values in zip(keys, zip(*partition)):
+                chunks[key].append(
+                    np.asarray(values, dtype=np.float32) if key == 'price' else values
+                )
+        
+        columns = {}
+        for key, parts in chunks.items():
+            if key == 'price':
+                columns[key] = np.concatenate(parts) if parts else np.empty(0, dtype=np.float32)
+            else:
+                columns[key] = [value for part in parts for value in part]
+        return pd.DataFrame(columns)
+    
+    async def _fetch_history(
+        self,
+        query: Select,
+        params: Dict,
+        stream_chunk: Optional[int] = None
+    ) -> Tuple[pd.DataFrame, Dict[str, Tuple[float, float]]]:
+        """
+        Fetch mode-tagged price history plus per-mode (overall_avg, recent_avg) stats
+        query is one of the module-level *_HISTORY_STMT / union statements (stats already attached)
+        """
+        async with self._db_lock:
+            df = await self._query_df(query, params, stream_chunk=stream_chunk)
+        
+        # The window columns repeat per row - read them once per mode straight from NumPy
+        modes, first_rows = np.unique(df['mode'].to_numpy(), return_index=True)
+        overall = df['overall_avg'].to_numpy(dtype=np.float64)[first_rows]
+        recent = df['recent_avg'].to_numpy(dtype=np.float64)[first_rows]
+        stats = {
+            mode: (float(overall_avg), float(recent_avg))
+            for mode, overall_avg, recent_avg in zip(modes, overall, recent)
+        }
+        return df.drop(columns=['overall_avg', 'recent_avg']), stats
+    
+    async def _forecast_off_loop(
+        self,
+        df: pd.DataFrame,
+        target_date: datetime,
+        features: Optional[List[str]] = None
+    ) -> Optional[Dict]:
+        """Run the CPU-bound forecast in a worker thread (None when there is no history)"""
+        if df.empty:
+            return None
+        return await asyncio.to_thread(self.forecaster.forecast, df, target_date, features=features)
+    
+    async def _fetch_prices_df(
+        self,
+        query: Select,
+        params: Dict,
+        stream_chunk: Optional[int] = None
+    ) -> Tuple[pd.DataFrame, Optional[Tuple[float, float]]]:
+        """Fetch a single mode's price history (without the mode tag) and its price stats"""
+        df, stats = await self._fetch_history(query, params, stream_chunk=stream_chunk)
+        return df.drop(columns='mode'), next(iter(stats.values()), None)
+    
+    def _split_modes(self, df: pd.DataFrame, modes: Tuple[str, ...]) -> Dict[str, pd.DataFrame]:
+        """Split mode-tagged history into per-mode frames (empty frames for missing modes)"""
+        frames = {mode: group.drop(columns='mode') for mode, group in df.groupby('mode')}
+        empty = df.drop(columns='mode').iloc[0:0]
+        return {mode: frames.get(mode, empty) for mode in modes}
+    
+    async def _fetch_mode_frames(
+        self,
+        origin: str,
+        destination: str
+    ) -> Tuple[Dict[str, pd.DataFrame], Dict[str, Tuple[float, float]]]:
+        """Fetch flight, train and bus history in one mode-tagged UNION ALL and split it by mode"""
+        df, stats = await self._fetch_history(MODE_COMPARISON_STMT, {
+            'origin': origin,
+            'destination': destination,
+            'cabin_class': CabinClass.ECONOMY,
+            'train_class': TrainClass.SLEEPER,
+            'bus_type': BusType.SEATER
+        })
+        return self._split_modes(df, ('flight', 'train', 'bus')), stats
+    
+    async def _fetch_panel(
+        self,
+        origin: str,
+        destination: str
+    ) -> Tuple[pd.DataFrame, Dict[str, Tuple[float, float]]]:
+        """
+        Fetch flight, hotel and car rental history for a trip as one panel indexed by (mode, date)
+        Hotel and car rows are anchored on the destination city
+        """
+        df, stats = await self._fetch_history(VACATION_PANEL_STMT, {
+            'origin': origin,
+            'destination': destination,
+            'cabin_class': CabinClass.ECONOMY,
+            'city': destination,
+            'hotel_category': HotelCategory.THREE_STAR,
+            'car_type': CarType.SEDAN
+        })
+        return df.set_index(['mode', 'date']), stats
+    
+    def _calculate_trend(self, overall_avg: float, recent_avg: float) -> str:
+        """Calculate price trend from the overall and last-10 average prices"""
+        return TRENDS[(recent_avg >= overall_avg * 0.9) + (recent_avg > overall_avg * 1.1)]
     
     def _get_recommendation(self, predicted_price: float, historical_avg: float) -> str:
         """Get booking recommendation"""
-        ratio = predicted_price / historical_avg
-        
-        if ratio < 0.85:
-            return "Excellent price! Book now."
-        elif ratio < 0.95:
-            return "Good deal. Consider booking."
-        elif ratio < 1.05:
-            return "Average price. Book if convenient."
-        elif ratio < 1.15:
-            return "Slightly expensive. Consider waiting."
-        else:
-            return "High price. Wait for better rates."
+        return RECOMMENDATIONS[bisect.bisect_right(RECOMMENDATION_THRESHOLDS, predicted_price / historical_avg)]
@@ -5,13 +5,38 @@ Intelligently combines flights, hotels, and car rentals for optimal pricing
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 import asyncio
+import numpy as np
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, and_
 
-from app.models.models import Flight, Hotel, CarRental, TravelMode
+from app.models.models import (
+    Flight, Hotel, CarRental, TravelMode, CabinClass, HotelCategory, RoomType, CarType
+)
 from app.services.forecasting.universal_predictor import UniversalTravelPricePredictor
 
 
+# Price multipliers after each bundle discount (15% vacation, 10% business, 12% weekend)
+VACATION_PRICE_FACTOR = 0.85
+BUSINESS_PRICE_FACTOR = 0.90
+WEEKEND_PRICE_FACTOR = 0.88
+
+# Discount still applied when a vacation package is trimmed to fit a budget (10%)
+BUDGET_FIT_PRICE_FACTOR = 0.90
+
+# Group discount tiers: 10% for 4-9 people, 15% for 10-19, 20% for 20+
+GROUP_DISCOUNT_EDGES = np.array([10, 20])
+GROUP_DISCOUNT_RATES = np.array([0.10, 0.15, 0.20])
+
+# Ordered (predicate, package type) rules for suggest_package_type; first match wins
+# Predicates take (trip_duration_days, is_business, budget_conscious, group_size)
+PACKAGE_TYPE_RULES = (
+    (lambda days, business, budget, group: group >= 4, "group_package"),
+    (lambda days, business, budget, group: business, "business_package"),
+    (lambda days, business, budget, group: budget, "budget_package"),
+    (lambda days, business, budget, group: days <= 3, "weekend_getaway"),
+)
+
+
 class TravelPackageBundler:
     """
     Creates optimized travel packages by combining multiple travel modes
@@ -35,19 +60,11 @@ class TravelPackageBundler:
         Create a complete vacation package with flight + hotel + car
         """
         
-        # Concurrent predictions for all components
-        flight_pred, hotel_pred, car_pred = await asyncio.gather(
-            self.predictor.predict_flight_price(origin, destination, departure_date),
-            self.predictor.predict_hotel_price(
-                destination, 
-                departure_date, 
-                return_date
-            ),
-            self.predictor.predict_car_rental_price(
-                destination,
-                departure_date,
-                (return_date - departure_date).days
-            )
+        trip_days = return_date.toordinal() - departure_date.toordinal()
+        
+        # One panel fetch + one forecaster call for all components
+        flight_pred, hotel_pred, car_pred = await self.predictor.predict_vacation_components(
+            origin, destination, departure_date, return_date
         )
         
         # Calculate package pricing
@@ -58,8 +75,8 @@ class TravelPackageBundler:
         )
         
         # Package discount (15% when booking all 3)
-        package_discount = base_total * 0.15
-        final_price = base_total - package_discount
+        final_price = base_total * VACATION_PRICE_FACTOR
+        package_discount = base_total - final_price
         
         # Check budget constraint
         within_budget = True
@@ -67,7 +84,7 @@ class TravelPackageBundler:
             within_budget = False
             # Try to adjust
             final_price = await self._optimize_for_budget(
-                origin, destination, departure_date, return_date, budget
+                flight_pred, destination, departure_date, return_date
             )
         
         return {
@@ -86,7 +103,7 @@ class TravelPackageBundler:
             },
             "within_budget": within_budget,
             "savings": package_discount,
-            "trip_duration_days": (return_date - departure_date).days
+            "trip_duration_days": trip_days
         }
     
     async def create_business_package(
@@ -101,34 +118,38 @@ class TravelPackageBundler:
         Business travel package (flight + business hotel + optional car)
         """
         
-        # Get flight prediction
-        flight_pred = await self.predictor.predict_flight_price(
-            origin, destination, departure_date, cabin_class="business"
-        )
+        trip_days = return_date.toordinal() - departure_date.toordinal()
         
-        # Get 4-star hotel prediction
-        hotel_pred = await self.predictor.predict_hotel_price(
-            destination,
-            departure_date,
-            return_date,
-            hotel_category="four_star"
-        )
+        # Business flight, 4-star hotel and optional car concurrently; a failure cancels the rest
+        async with asyncio.TaskGroup() as tg:
+            flight_task = tg.create_task(self.predictor.predict_flight_price(
+                origin, destination, departure_date, cabin_class=CabinClass.BUSINESS
+            ))
+            hotel_task = tg.create_task(self.predictor.predict_hotel_price(
+                destination,
+                departure_date,
+                return_date,
+                hotel_category=HotelCategory.FOUR_STAR
+            ))
+            car_task = tg.create_task(self.predictor.predict_car_rental_price(
+                destination,
+                departure_date,
+                trip_days,
+                car_type=CarType.SEDAN
+            )) if include_car else None
         
+        flight_pred = flight_task.result()
+        hotel_pred = hotel_task.result()
         base_total = flight_pred.get('predicted_price', 0) + hotel_pred.get('total_price', 0)
         
         car_pred = None
-        if include_car:
-            car_pred = await self.predictor.predict_car_rental_price(
-                destination,
-                departure_date,
-                (return_date - departure_date).days,
-                car_type="sedan"
-            )
+        if car_task:
+            car_pred = car_task.result()
             base_total += car_pred.get('total_price', 0)
         
         # Business package discount (10%)
-        package_discount = base_total * 0.10
-        final_price = base_total - package_discount
+        final_price = base_total * BUSINESS_PRICE_FACTOR
+        package_discount = base_total - final_price
         
         components = {
             "flight": flight_pred,
@@ -201,12 +222,12 @@ class TravelPackageBundler:
                 }
         
         # If overnight stay needed, add budget hotel
-        if return_date and (return_date - travel_date).days > 0:
+        if return_date and return_date.toordinal() > travel_date.toordinal():
             hotel_pred = await self.predictor.predict_hotel_price(
                 destination,
                 travel_date,
                 return_date,
-                hotel_category="budget"
+                hotel_category=HotelCategory.BUDGET
             )
             package["components"] = {
                 "travel": cheapest_mode[1],
@@ -228,30 +249,34 @@ class TravelPackageBundler:
         """
         
         # Ensure it's a weekend
-        if departure_date.weekday() not in [4, 5]:  # Friday or Saturday
+        weekday = departure_date.weekday()
+        if weekday not in (4, 5):  # Friday or Saturday
             # Adjust to next Friday
-            days_ahead = (4 - departure_date.weekday()) % 7
+            days_ahead = (4 - weekday) % 7
             departure_date = departure_date + timedelta(days=days_ahead)
         
         return_date = departure_date + timedelta(days=2)  # 2 nights
         
-        # Get predictions
-        flight_pred = await self.predictor.predict_flight_price(
-            origin, destination, departure_date
-        )
+        # Get predictions concurrently
+        async with asyncio.TaskGroup() as tg:
+            flight_task = tg.create_task(self.predictor.predict_flight_price(
+                origin, destination, departure_date
+            ))
+            hotel_task = tg.create_task(self.predictor.predict_hotel_price(
+                destination,
+                departure_date,
+                return_date,
+                hotel_category=HotelCategory.THREE_STAR
+            ))
         
-        hotel_pred = await self.predictor.predict_hotel_price(
-            destination,
-            departure_date,
-            return_date,
-            hotel_category="three_star"
-        )
+        flight_pred = flight_task.result()
+        hotel_pred = hotel_task.result()
         
         base_total = flight_pred.get('predicted_price', 0) + hotel_pred.get('total_price', 0)
         
         # Weekend package discount (12%)
-        package_discount = base_total * 0.12
-        final_price = base_total - package_discount
+        final_price = base_total * WEEKEND_PRICE_FACTOR
+        package_discount = base_total - final_price
         
         return {
             "package_type": "weekend_getaway",
@@ -302,7 +327,7 @@ class TravelPackageBundler:
             destination,
             departure_date,
             return_date,
-            room_type="family"
+            room_type=RoomType.FAMILY
         )
         
         # Calculate per-person costs
@@ -312,13 +337,8 @@ class TravelPackageBundler:
         
         base_per_person = flight_cost_per_person + hotel_cost_per_person
         
-        # Group discounts (scales with group size)
-        if group_size >= 20:
-            discount_rate = 0.20  # 20% for 20+
-        elif group_size >= 10:
-            discount_rate = 0.15  # 15% for 10-19
-        else:
-            discount_rate = 0.10  # 10% for 4-9
+        # Group discounts (scales with group size; a tier edge belongs to the higher tier)
+        discount_rate = float(GROUP_DISCOUNT_RATES[np.searchsorted(GROUP_DISCOUNT_EDGES, group_size, side='right')])
         
         discounted_per_person = base_per_person * (1 - discount_rate)
         total_price = discounted_per_person * group_size
@@ -349,26 +369,22 @@ class TravelPackageBundler:
     
     async def _optimize_for_budget(
         self,
-        origin: str,
+        flight_pred: Dict,
         destination: str,
         departure_date: datetime,
-        return_date: datetime,
-        budget: float
+        return_date: datetime
     ) -> float:
         """
         Try to fit package within budget by adjusting options
+        flight_pred is the caller's economy flight prediction, reused as-is
         """
         
-        # Try economy flight + budget hotel
-        flight_pred = await self.predictor.predict_flight_price(
-            origin, destination, departure_date, cabin_class="economy"
-        )
-        
+        # Economy flight (already predicted) + budget hotel
         hotel_pred = await self.predictor.predict_hotel_price(
             destination,
             departure_date,
             return_date,
-            hotel_category="budget"
+            hotel_category=HotelCategory.BUDGET
         )
         
         # Skip car rental to save money
@@ -377,8 +393,8 @@ class TravelPackageBundler:
             hotel_pred.get('total_price', 0)
         )
         
-        # Still apply 10% package discount
-        adjusted_total *= 0.90
+        # Still apply the package discount
+        adjusted_total *= BUDGET_FIT_PRICE_FACTOR
         
         return adjusted_total
 
@@ -391,17 +407,8 @@ def suggest_package_type(
     group_size: int
 ) -> str:
     """Suggest the most appropriate package type"""
-    
-    if group_size >= 4:
-        return "group_package"
-    
-    if is_business:
-        return "business_package"
-    
-    if budget_conscious:
-        return "budget_package"
-    
-    if trip_duration_days <= 3:
-        return "weekend_getaway"
+    for predicate, package_type in PACKAGE_TYPE_RULES:
+        if predicate(trip_duration_days, is_business, budget_conscious, group_size):
+            return package_type
     
     return "vacation_package"
@@ -1,32 +1,155 @@
 from fastapi import WebSocket
-from typing import List
-import json
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+from datetime import date
 import asyncio
 import logging
+import time
+import zlib
+import msgpack
+import numpy as np
+import orjson
+from prometheus_client import Counter, Gauge
 
 logger = logging.getLogger(__name__)
 
+# A client that can't take a frame within this long is treated as disconnected
+SEND_TIMEOUT_SECONDS = 5.0
+
+# orjson flags matching json.dumps leniency (non-str keys) plus NumPy scalars from the predictors
+JSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+# Subprotocol a client offers to receive price updates as compact msgpack binary frames
+# ({"t": "pu", "r": route, "d": price_data, "ts": timestamp}); JSON text stays the default
+MSGPACK_SUBPROTOCOL = "msgpack"
+
+# Subprotocol for clients that take zlib-compressed JSON as binary frames; each message is
+# compressed once per broadcast instead of once per connection by permessage-deflate
+DEFLATE_SUBPROTOCOL = "json.deflate"
+DEFLATE_LEVEL = 1
+
+# Subprotocol for clients that take uncompressed JSON as binary frames (decoded client-side
+# with TextDecoder); the payload is UTF-8 encoded once per broadcast rather than per send
+BINARY_JSON_SUBPROTOCOL = "json.binary"
+
+# Payloads larger than this are compressed in a worker thread (zlib releases the GIL)
+OFFLOAD_THRESHOLD_BYTES = 4096
+
+# Socket sends in flight at once across all client writers (bounds transmit buffer memory)
+MAX_CONCURRENT_SENDS = 256
+
+# Clients enqueued per event-loop turn during a broadcast before yielding to other tasks
+BROADCAST_BATCH = 50
+
+# Minimum spacing of price updates per route; faster updates are coalesced to the latest one
+COALESCE_INTERVAL_SECONDS = 0.1
+
+# Messages buffered per client; when full the oldest is dropped (only the latest prices matter)
+CLIENT_QUEUE_SIZE = 256
+
+# Drops in a row (no successful enqueue in between) before a slow client is disconnected
+MAX_CONSECUTIVE_DROPS = 256
+
+# Backpressure metrics, exported on /metrics
+WS_QUEUED_MESSAGES = Gauge("ws_queued_messages", "Messages waiting in WebSocket client send queues")
+WS_MAX_QUEUE_DEPTH = Gauge("ws_max_queue_depth", "Deepest WebSocket client send queue")
+WS_DROPPED_MESSAGES = Counter("ws_dropped_messages_total", "Queued messages dropped for slow WebSocket clients")
+
+
+def _msgpack_default(obj: Any) -> Any:
+    """msgpack fallback for the types orjson handles natively (NumPy values from the predictors, dates)"""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, date):
+        return obj.isoformat()
+    raise TypeError(f"Cannot serialize {type(obj).__name__} to msgpack")
+
+
+# Wire format negotiated per connection
+FORMAT_JSON, FORMAT_MSGPACK, FORMAT_DEFLATE, FORMAT_BINARY_JSON = 0, 1, 2, 3
+
 
 class ConnectionManager:
     """Manages WebSocket connections for real-time price updates"""
     
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.subscriptions: dict = {}  # {websocket: [routes]}
+        # Connection state as parallel arrays indexed by a dense integer connection id
+        self._conns: List[WebSocket] = []
+        self._queues: List[asyncio.Queue] = []  # outgoing messages, drained by the writer
+        self._writers: List[asyncio.Task] = []
+        self._formats: List[int] = []  # FORMAT_* per connection
+        self._conn_routes: List[Set[str]] = []  # subscribed routes per connection
+        self._drops: List[int] = []  # consecutive dropped messages per connection
+        self._conn_id: Dict[WebSocket, int] = {}
+        self.by_route: Dict[str, Set[int]] = {}  # {route: {connection ids}}, inverse of _conn_routes
+        self._send_semaphore = asyncio.Semaphore(MAX_CONCURRENT_SENDS)
+        self._last_sent: Dict[str, float] = {}  # {route: monotonic time of last price update sent}
+        self._pending: Dict[str, dict] = {}  # {route: latest coalesced price_data}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._close_tasks: Set[asyncio.Task] = set()  # strong refs until each close finishes
+        
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        """Currently connected clients"""
+        return self._conns
+        
+    def queue_depths(self) -> List[int]:
+        """Current send queue size per connection"""
+        return [queue.qsize() for queue in self._queues]
         
     async def connect(self, websocket: WebSocket):
-        """Accept new WebSocket connection"""
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        logger.info(f"New WebSocket connection. Total: {len(self.active_connections)}")
+        """Accept new WebSocket connection (negotiating msgpack / deflate / binary JSON if offered) and start its writer task"""
+        offered = websocket.scope.get("subprotocols", ())
+        if MSGPACK_SUBPROTOCOL in offered:
+            await websocket.accept(subprotocol=MSGPACK_SUBPROTOCOL)
+            wire_format = FORMAT_MSGPACK
+        elif DEFLATE_SUBPROTOCOL in offered:
+            await websocket.accept(subprotocol=DEFLATE_SUBPROTOCOL)
+            wire_format = FORMAT_DEFLATE
+        elif BINARY_JSON_SUBPROTOCOL in offered:
+            await websocket.accept(subprotocol=BINARY_JSON_SUBPROTOCOL)
+            wire_format = FORMAT_BINARY_JSON
+        else:
+            await websocket.accept()
+            wire_format = FORMAT_JSON
+        
+        queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self._conn_id[websocket] = len(self._conns)
+        self._conns.append(websocket)
+        self._queues.append(queue)
+        self._writers.append(asyncio.create_task(self._writer_loop(websocket, queue)))
+        self._formats.append(wire_format)
+        self._conn_routes.append(set())
+        self._drops.append(0)
+        logger.info(f"New WebSocket connection. Total: {len(self._conns)}")
         
     def disconnect(self, websocket: WebSocket):
         """Remove WebSocket connection"""
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        if websocket in self.subscriptions:
-            del self.subscriptions[websocket]
-        logger.info(f"WebSocket disconnected. Remaining: {len(self.active_connections)}")
+        cid = self._conn_id.pop(websocket, None)
+        if cid is None:
+            return
+        
+        for route in self._conn_routes[cid]:
+            self._remove_subscriber(route, cid)
+        writer = self._writers[cid]
+        if writer is not asyncio.current_task():
+            writer.cancel()
+        
+        # Move the last connection into the freed slot so the arrays stay dense
+        last = len(self._conns) - 1
+        arrays = (self._conns, self._queues, self._writers, self._formats, self._conn_routes, self._drops)
+        if cid != last:
+            for route in self._conn_routes[last]:
+                subscribers = self.by_route[route]
+                subscribers.discard(last)
+                subscribers.add(cid)
+            for array in arrays:
+                array[cid] = array[last]
+            self._conn_id[self._conns[cid]] = cid
+        for array in arrays:
+            array.pop()
+        logger.info(f"WebSocket disconnected. Remaining: {len(self._conns)}")
         
     async def send_personal_message(self, message: str, websocket: WebSocket):
         """Send message to specific client"""
@@ -36,57 +159,225 @@ class ConnectionManager:
             logger.error(f"Error sending personal message: {e}")
             self.disconnect(websocket)
             
-    async def broadcast(self, message: str):
-        """Broadcast message to all connected clients"""
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_text(message)
-            except Exception as e:
-                logger.error(f"Error broadcasting to client: {e}")
-                disconnected.append(connection)
+    async def _writer_loop(self, websocket: WebSocket, queue: asyncio.Queue):
+        """
+        Send a client's queued messages in order; any send failure disconnects it
+        Everything already queued when the writer wakes is drained and batched into as few frames as possible
+        """
+        try:
+            while True:
+                batch = [await queue.get()]
+                while not queue.empty():
+                    batch.append(queue.get_nowait())
+                for frame in self._batch_frames(batch):
+                    async with self._send_semaphore:
+                        send = websocket.send_bytes(frame) if isinstance(frame, bytes) else websocket.send_text(frame)
+                        await asyncio.wait_for(send, timeout=SEND_TIMEOUT_SECONDS)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error sending to client: {e}")
+            self.disconnect(websocket)
+            
+    @staticmethod
+    def _batch_frames(messages: List[Union[str, bytes]]) -> List[Union[str, bytes]]:
+        """
+        Merge drained messages into frames, keeping their order
+        Runs of JSON-object messages (text, or UTF-8 bytes for binary JSON clients) become one
+        {"type": "batch", "messages": [...]} frame; anything else (plain-text echoes, msgpack,
+        deflate) is sent as its own frame
+        """
+        frames: List[Union[str, bytes]] = []
+        pending: List[Union[str, bytes]] = []
+        
+        def flush():
+            if len(pending) == 1:
+                frames.append(pending[0])
+            elif pending:
+                # Messages are already serialized JSON - splice them in without re-encoding
+                if isinstance(pending[0], bytes):
+                    frames.append(b'{"type": "batch", "messages": [' + b', '.join(pending) + b']}')
+                else:
+                    frames.append('{"type": "batch", "messages": [' + ', '.join(pending) + ']}')
+            pending.clear()
+        
+        for message in messages:
+            # A client's queue holds one JSON flavour; msgpack maps and zlib streams never start with "{"
+            if message[:1] in ('{', b'{'):
+                pending.append(message)
+            else:
+                flush()
+                frames.append(message)
+        flush()
+        
+        return frames
+            
+    def _enqueue(self, websocket: WebSocket, queue: asyncio.Queue, message: Union[str, bytes]):
+        """
+        Queue a message for a client without waiting on its socket
+        A full queue drops its oldest message; a client that stays full for MAX_CONSECUTIVE_DROPS
+        messages is disconnected
+        """
+        cid = self._conn_id.get(websocket)
+        if cid is None:
+            return  # disconnected since the broadcast took its snapshot
         
-        # Clean up disconnected clients
-        for conn in disconnected:
-            self.disconnect(conn)
+        if queue.full():
+            queue.get_nowait()
+            WS_DROPPED_MESSAGES.inc()
+            self._drops[cid] += 1
+            if self._drops[cid] >= MAX_CONSECUTIVE_DROPS:
+                logger.warning("WebSocket client too slow, disconnecting")
+                self.disconnect(websocket)
+                close_task = asyncio.create_task(self._close(websocket))
+                self._close_tasks.add(close_task)
+                close_task.add_done_callback(self._close_tasks.discard)
+                return
+        else:
+            self._drops[cid] = 0
+        queue.put_nowait(message)
+            
+    async def _close(self, websocket: WebSocket):
+        """Close a dropped client's socket (policy violation), ignoring errors"""
+        try:
+            await websocket.close(code=1008)
+        except Exception:
+            pass
+            
+    async def _compress(self, data: bytes) -> bytes:
+        """zlib-compress an encoded message, off the event loop when it is large"""
+        if len(data) > OFFLOAD_THRESHOLD_BYTES:
+            return await asyncio.to_thread(zlib.compress, data, DEFLATE_LEVEL)
+        return zlib.compress(data, DEFLATE_LEVEL)
+            
+    async def broadcast(self, message: str):
+        """Broadcast message to all connected clients (queued per client)"""
+        data = message.encode()
+        compressed = None
+        targets = tuple(zip(self._conns, self._queues, self._formats))  # snapshot: connects/disconnects may interleave
+        for i, (connection, queue, wire_format) in enumerate(targets):
+            if i and i % BROADCAST_BATCH == 0:
+                await asyncio.sleep(0)  # let requests interleave with a large fan-out
+            if wire_format == FORMAT_DEFLATE:
+                if compressed is None:
+                    compressed = await self._compress(data)
+                self._enqueue(connection, queue, compressed)
+            elif wire_format == FORMAT_BINARY_JSON:
+                self._enqueue(connection, queue, data)
+            else:
+                self._enqueue(connection, queue, message)
             
     async def broadcast_price_update(self, route: str, price_data: dict):
         """
         Broadcast price update to subscribed clients
+        A route is sent at most once per COALESCE_INTERVAL_SECONDS; updates in between are
+        coalesced and only the latest price_data goes out with the next flush
         
         Args:
             route: Flight route (e.g., "BOM-DEL")
             price_data: Dictionary with price information
         """
-        message = json.dumps({
-            "type": "price_update",
-            "route": route,
-            "data": price_data,
-            "timestamp": str(datetime.utcnow())
-        })
-        
-        # Send to all subscribed clients
-        for websocket, routes in self.subscriptions.items():
-            if route in routes or "all" in routes:
-                try:
-                    await websocket.send_text(message)
-                except Exception as e:
-                    logger.error(f"Error sending price update: {e}")
+        now = time.monotonic()
+        if route not in self._pending and now - self._last_sent.get(route, float('-inf')) >= COALESCE_INTERVAL_SECONDS:
+            self._last_sent[route] = now
+            await self.broadcast_price_updates([(route, price_data)])
+            return
+        
+        self._pending[route] = price_data
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+            
+    async def _flush_loop(self):
+        """Send coalesced price updates every COALESCE_INTERVAL_SECONDS until none are pending"""
+        while self._pending:
+            await asyncio.sleep(COALESCE_INTERVAL_SECONDS)
+            updates = list(self._pending.items())
+            self._pending.clear()
+            
+            now = time.monotonic()
+            for route, _ in updates:
+                self._last_sent[route] = now
+            try:
+                await self.broadcast_price_updates(updates)
+            except Exception as e:
+                logger.error(f"Error flushing price updates: {e}")
+        
+    async def broadcast_price_updates(self, updates: List[Tuple[str, dict]]):
+        """
+        Broadcast a burst of price updates to subscribed clients
+        The clock is read once and every message shares that timestamp (Unix epoch milliseconds)
+        
+        Args:
+            updates: (route, price_data) pairs, as for broadcast_price_update
+        """
+        timestamp = time.time_ns() // 1_000_000
+        everyone = self.by_route.get("all", set())
+        
+        for route, price_data in updates:
+            data = orjson.dumps({
+                "type": "price_update",
+                "route": route,
+                "data": price_data,
+                "timestamp": timestamp
+            }, option=JSON_OPTIONS)
+            message = data.decode()
+            packed = compressed = None
+            
+            # Only the route's own subscribers plus "all" wildcards are touched; ids are
+            # resolved up front since a disconnect during a yield can reassign them
+            targets = tuple(
+                (self._conns[cid], self._queues[cid], self._formats[cid])
+                for cid in self.by_route.get(route, set()) | everyone
+            )
+            for i, (websocket, queue, wire_format) in enumerate(targets):
+                if i and i % BROADCAST_BATCH == 0:
+                    await asyncio.sleep(0)
+                if wire_format == FORMAT_MSGPACK:
+                    if packed is None:
+                        packed = msgpack.packb(
+                            {"t": "pu", "r": route, "d": price_data, "ts": timestamp},
+                            use_bin_type=True,
+                            default=_msgpack_default
+                        )
+                    self._enqueue(websocket, queue, packed)
+                elif wire_format == FORMAT_DEFLATE:
+                    if compressed is None:
+                        compressed = await self._compress(data)
+                    self._enqueue(websocket, queue, compressed)
+                elif wire_format == FORMAT_BINARY_JSON:
+                    self._enqueue(websocket, queue, data)
+                else:
+                    self._enqueue(websocket, queue, message)
                     
     async def subscribe_route(self, websocket: WebSocket, route: str):
         """Subscribe client to route updates"""
-        if websocket not in self.subscriptions:
-            self.subscriptions[websocket] = []
-        if route not in self.subscriptions[websocket]:
-            self.subscriptions[websocket].append(route)
+        cid = self._conn_id.get(websocket)
+        if cid is None:
+            return
+        routes = self._conn_routes[cid]
+        if route not in routes:
+            routes.add(route)
+            self.by_route.setdefault(route, set()).add(cid)
             logger.info(f"Client subscribed to route: {route}")
             
     async def unsubscribe_route(self, websocket: WebSocket, route: str):
         """Unsubscribe client from route updates"""
-        if websocket in self.subscriptions and route in self.subscriptions[websocket]:
-            self.subscriptions[websocket].remove(route)
+        cid = self._conn_id.get(websocket)
+        if cid is not None and route in self._conn_routes[cid]:
+            self._conn_routes[cid].discard(route)
+            self._remove_subscriber(route, cid)
             logger.info(f"Client unsubscribed from route: {route}")
+            
+    def _remove_subscriber(self, route: str, cid: int):
+        """Drop a connection id from the route index, forgetting routes with no subscribers left"""
+        subscribers = self.by_route.get(route)
+        if subscribers is not None:
+            subscribers.discard(cid)
+            if not subscribers:
+                del self.by_route[route]
 
 
 # Global manager instance
 manager = ConnectionManager()
+WS_QUEUED_MESSAGES.set_function(lambda: sum(manager.queue_depths()))
+WS_MAX_QUEUE_DEPTH.set_function(lambda: max(manager.queue_depths(), default=0))
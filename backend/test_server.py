@@ -189,5 +189,13 @@ if __name__ == "__main__":
     print(f"   Amadeus Environment: {os.getenv('AMADEUS_ENVIRONMENT', 'test')}")
     print(f"   API Key configured: {'Yes' if os.getenv('AMADEUS_API_KEY') else 'No'}")
     print("=" * 70)
-    uvicorn.run(app, host="0.0.0.0", port=port, log_level="info")
+    # uvloop + httptools (from uvicorn[standard]); uvloop has no Windows build
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=port,
+        log_level="info",
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools"
+    )
 
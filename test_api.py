@@ -2,7 +2,8 @@
 Test script to demonstrate the Multi-Modal Travel API
 Run this after the backend is running on http://localhost:8000
 """
-import requests
+import asyncio
+import httpx
 import json
 from datetime import datetime, timedelta
 
@@ -19,13 +20,13 @@ def print_response(title, response):
         print(f"❌ Error {response.status_code}: {response.text}")
     print()
 
-def test_health_check():
+async def test_health_check(client):
     """Test if API is running"""
-    response = requests.get("http://localhost:8000/health")
+    response = await client.get("http://localhost:8000/health")
     print_response("🏥 Health Check", response)
     return response.status_code == 200
 
-def test_travel_search():
+async def test_travel_search(client):
     """Test multi-modal travel search"""
     search_data = {
         "origin": "DEL",  # Delhi
@@ -35,10 +36,10 @@ def test_travel_search():
         "travel_modes": ["flight", "train", "bus"]
     }
     
-    response = requests.post(f"{BASE_URL}/travel/search", json=search_data)
+    response = await client.post(f"{BASE_URL}/travel/search", json=search_data)
     print_response("🔍 Multi-Modal Search (Delhi to Mumbai)", response)
 
-def test_compare_modes():
+async def test_compare_modes(client):
     """Test price comparison across travel modes"""
     params = {
         "origin": "DEL",
@@ -47,10 +48,10 @@ def test_compare_modes():
         "passenger_count": 1
     }
     
-    response = requests.get(f"{BASE_URL}/travel/compare", params=params)
+    response = await client.get(f"{BASE_URL}/travel/compare", params=params)
     print_response("💰 Price Comparison - All Modes", response)
 
-def test_vacation_package():
+async def test_vacation_package(client):
     """Test creating a vacation package"""
     package_data = {
         "user_email": "pranav@example.com",
@@ -68,10 +69,10 @@ def test_vacation_package():
         "passenger_count": 2
     }
     
-    response = requests.post(f"{BASE_URL}/travel/package/create", json=package_data)
+    response = await client.post(f"{BASE_URL}/travel/package/create", json=package_data)
     print_response("🎁 Vacation Package (Flight + Hotel + Car)", response)
 
-def test_price_prediction():
+async def test_price_prediction(client):
     """Test flight price prediction"""
     predict_data = {
         "origin": "DEL",
@@ -81,10 +82,10 @@ def test_price_prediction():
         "passengers": 1
     }
     
-    response = requests.post(f"{BASE_URL}/forecast/predict", json=predict_data)
+    response = await client.post(f"{BASE_URL}/forecast/predict", json=predict_data)
     print_response("📊 Price Prediction (Flight)", response)
 
-def test_create_booking():
+async def test_create_booking(client):
     """Test creating a booking"""
     booking_data = {
         "user_email": "pranav@example.com",
@@ -101,17 +102,17 @@ def test_create_booking():
         "special_requests": "Window seat preferred"
     }
     
-    response = requests.post(f"{BASE_URL}/travel/book", json=booking_data)
+    response = await client.post(f"{BASE_URL}/travel/book", json=booking_data)
     print_response("✈️ Create Booking", response)
     
     if response.status_code == 200:
         booking_id = response.json().get("booking_id")
         if booking_id:
             # Test getting the booking
-            get_response = requests.get(f"{BASE_URL}/travel/bookings/{booking_id}")
+            get_response = await client.get(f"{BASE_URL}/travel/bookings/{booking_id}")
             print_response(f"📋 Get Booking Details ({booking_id})", get_response)
 
-def demo_all_features():
+async def demo_all_features():
     """Run all demonstrations"""
     print("\n" + "🚀"*30)
     print("  MULTI-MODAL TRAVEL API DEMONSTRATION")
@@ -119,21 +120,25 @@ def demo_all_features():
     print("  Pranav Kumar (590011587) & Om (590014492)")
     print("🚀"*30)
     
-    # Check if API is running
-    if not test_health_check():
-        print("\n❌ API is not running. Start it with:")
-        print("   cd backend")
-        print("   venv\\Scripts\\python.exe -m uvicorn app.main:app --reload")
-        return
-    
-    print("\n✅ API is healthy! Running demonstrations...\n")
-    
-    # Run all tests
-    test_travel_search()
-    test_compare_modes()
-    test_price_prediction()
-    test_vacation_package()
-    test_create_booking()
+    # One pooled client shared by every demo request
+    async with httpx.AsyncClient(timeout=30.0) as client:
+        # Check if API is running
+        if not await test_health_check(client):
+            print("\n❌ API is not running. Start it with:")
+            print("   cd backend")
+            print("   venv\\Scripts\\python.exe -m uvicorn app.main:app --reload")
+            return
+        
+        print("\n✅ API is healthy! Running demonstrations...\n")
+        
+        # Run all tests concurrently - they are independent probes
+        await asyncio.gather(
+            test_travel_search(client),
+            test_compare_modes(client),
+            test_price_prediction(client),
+            test_vacation_package(client),
+            test_create_booking(client)
+        )
     
     print("\n" + "="*60)
     print("  🎉 DEMONSTRATION COMPLETE!")
@@ -150,8 +155,8 @@ def demo_all_features():
 
 if __name__ == "__main__":
     try:
-        demo_all_features()
-    except requests.exceptions.ConnectionError:
+        asyncio.run(demo_all_features())
+    except httpx.ConnectError:
         print("\n❌ Could not connect to API.")
         print("   Make sure the backend is running on http://localhost:8000")
         print("\n   Start it with:")